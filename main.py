@@ -1,21 +1,81 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
 from datetime import datetime, timezone
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
+from typing import Callable
+import asyncio
 import csv
 import io
 import json
+import logging
+import mmap
+import os
+import struct
+import tarfile
 import zipfile
 import threading
-
-app = FastAPI()
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ---------- JSON (orjson when available) ----------
+if orjson is not None:
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+
+    class FastJSONResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return orjson.dumps(content)
+else:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    FastJSONResponse = JSONResponse
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# ---------- Logging ----------
+# Per-request output is logged at DEBUG and only shown with DEBUG=1. When the
+# host has not configured logging, INFO (session start/stop) still prints.
+DEBUG = os.environ.get("DEBUG") == "1"
+
+logger = logging.getLogger(__name__)
+if DEBUG:
+    logger.setLevel(logging.DEBUG)
+if not logging.getLogger().handlers and not logger.handlers:
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(_handler)
 
 # ---------- Paths ----------
 BASE_DIR = Path(__file__).parent
 SESSIONS_DIR = BASE_DIR / "sessions"
 SESSIONS_DIR.mkdir(exist_ok=True)
 
-SESSION_STATE_FILE = BASE_DIR / "session_state.json"
+# directories already created by this process; skips redundant mkdir calls
+_known_dirs: set[Path] = {SESSIONS_DIR}
+
+SESSION_STATE_FILE = BASE_DIR / "session_state.bin"
 
 # ---------- In-memory cache + lock ----------
 state_lock = threading.Lock()
@@ -27,30 +87,149 @@ current_session_dir: Path | None = None
 
 
 # =============== STATE HELPERS (shared across workers) ===============
-def default_state() -> dict:
+# Session state lives in a small memory-mapped file shared by all workers:
+# seq:u32, logging:u8, start_epoch:i64, session_id_len:u16, session_id:32s.
+# seq is a seqlock counter: odd while a write is in progress. A seqlock
+# needs a single writer, so writers also take an flock on the file (where
+# fcntl exists) to serialize across worker processes.
+_STATE_STRUCT = struct.Struct("<IBqH32s")
+_SEQ_STRUCT = struct.Struct("<I")
+STATE_READ_RETRIES = 100
+
+# After the record, one slot per worker: heartbeat_ms:i64, acked_seq:u32.
+# Each worker's flusher refreshes its heartbeat and, once the rows it took
+# before a state change are on disk, acks that change's seq; /api/stop
+# waits only for live workers that have not acked the stop yet. Only the
+# owning worker writes a slot.
+_SLOT_STRUCT = struct.Struct("<qI4x")
+SLOTS_OFFSET = 64
+MAX_WORKERS = 16
+# a worker whose heartbeat is older than this has exited or hung
+WORKER_STALE_S = 5.0
+STATE_MAP_SIZE = SLOTS_OFFSET + MAX_WORKERS * _SLOT_STRUCT.size
+
+
+_state_file = SESSION_STATE_FILE.open("a+b")
+if _state_file.seek(0, 2) < STATE_MAP_SIZE:
+    _state_file.truncate(STATE_MAP_SIZE)
+_state_map = mmap.mmap(_state_file.fileno(), STATE_MAP_SIZE, access=mmap.ACCESS_WRITE)
+
+
+def load_state() -> dict:
+    for _ in range(STATE_READ_RETRIES):
+        seq, flag, epoch, sid_len, sid = _STATE_STRUCT.unpack_from(_state_map)
+        if not seq & 1 and _SEQ_STRUCT.unpack_from(_state_map)[0] == seq:
+            break
+    else:
+        logger.warning("Session state still changing after %d reads; using last read", STATE_READ_RETRIES)
     return {
-        "logging": False,
-        "start_epoch": 0,
-        "session_id": None,
+        "logging": bool(flag),
+        "start_epoch": epoch,
+        "session_id": sid[:sid_len].decode("ascii") if sid_len else None,
     }
 
 
-def load_state() -> dict:
-    if not SESSION_STATE_FILE.exists():
-        return default_state()
+def state_seq() -> int:
+    return _SEQ_STRUCT.unpack_from(_state_map)[0]
+
+
+def _lock_state_file() -> None:
+    if fcntl is not None:
+        fcntl.flock(_state_file.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_state_file() -> None:
+    if fcntl is not None:
+        fcntl.flock(_state_file.fileno(), fcntl.LOCK_UN)
+
+
+def save_state(state: dict) -> int:
+    """Write the state record and return its new seq."""
+    sid = (state.get("session_id") or "").encode("ascii")
+    if len(sid) > 32:
+        raise ValueError(f"session_id too long: {state['session_id']!r}")
+    _lock_state_file()
     try:
-        with SESSION_STATE_FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        for k, v in default_state().items():
-            data.setdefault(k, v)
-        return data
-    except Exception:
-        return default_state()
+        # an odd seq left behind by a crashed writer is reused, not bumped again
+        seq = _SEQ_STRUCT.unpack_from(_state_map)[0] | 1
+        _SEQ_STRUCT.pack_into(_state_map, 0, seq)
+        _STATE_STRUCT.pack_into(
+            _state_map, 0,
+            seq,
+            1 if state.get("logging") else 0,
+            int(state.get("start_epoch", 0) or 0),
+            len(sid),
+            sid,
+        )
+        seq = (seq + 1) & 0xFFFFFFFF
+        _SEQ_STRUCT.pack_into(_state_map, 0, seq)
+        _state_map.flush()
+    finally:
+        _unlock_state_file()
+    return seq
+
 
+_worker_slot: int | None = None
+_acked_seq = 0
 
-def save_state(state: dict) -> None:
-    with SESSION_STATE_FILE.open("w", encoding="utf-8") as f:
-        json.dump(state, f)
+
+def _slot_offset(slot: int) -> int:
+    return SLOTS_OFFSET + slot * _SLOT_STRUCT.size
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _seq_reached(seq: int, target: int) -> bool:
+    # seq is a wrapping u32 counter
+    return (seq - target) & 0xFFFFFFFF < 0x80000000
+
+
+def claim_worker_slot() -> None:
+    global _worker_slot, _acked_seq
+    now_ms = _now_ms()
+    _lock_state_file()
+    try:
+        for slot in range(MAX_WORKERS):
+            heartbeat_ms, _ = _SLOT_STRUCT.unpack_from(_state_map, _slot_offset(slot))
+            if now_ms - heartbeat_ms > WORKER_STALE_S * 1000:
+                _acked_seq = state_seq()
+                _SLOT_STRUCT.pack_into(_state_map, _slot_offset(slot), now_ms, _acked_seq)
+                _worker_slot = slot
+                return
+    finally:
+        _unlock_state_file()
+    logger.warning("All %d worker slots are taken; /api/stop will not wait for this worker", MAX_WORKERS)
+
+
+def release_worker_slot() -> None:
+    global _worker_slot
+    if _worker_slot is not None:
+        _SLOT_STRUCT.pack_into(_state_map, _slot_offset(_worker_slot), 0, 0)
+        _worker_slot = None
+
+
+def ack_state(seq: int | None = None) -> None:
+    """Refresh this worker's heartbeat and, if given, ack state ``seq``."""
+    global _acked_seq
+    if seq is not None:
+        _acked_seq = seq
+    if _worker_slot is not None:
+        _SLOT_STRUCT.pack_into(_state_map, _slot_offset(_worker_slot), _now_ms(), _acked_seq)
+
+
+def workers_behind(seq: int) -> int:
+    """Count the other live workers that have not acked state ``seq``."""
+    stale_ms = _now_ms() - WORKER_STALE_S * 1000
+    behind = 0
+    for slot in range(MAX_WORKERS):
+        if slot == _worker_slot:
+            continue
+        heartbeat_ms, acked = _SLOT_STRUCT.unpack_from(_state_map, _slot_offset(slot))
+        if heartbeat_ms > stale_ms and not _seq_reached(acked, seq):
+            behind += 1
+    return behind
 
 
 def sync_from_state(state: dict) -> None:
@@ -67,11 +246,37 @@ def new_session_id() -> str:
     return datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
 
 
+# bound once so the hot path skips the module attribute lookups
+_time_ns = time.time_ns
+_gmtime = time.gmtime
+
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") for the last second formatted;
+# rebound as one tuple so concurrent readers never see a mixed pair
+_iso_second: tuple[int, str] = (-1, "")
+
+
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="microseconds").replace("+00:00", "Z")
+    global _iso_second
+    s, rem = divmod(_time_ns(), 1_000_000_000)
+    sec, prefix = _iso_second
+    if s != sec:
+        t = _gmtime(s)
+        prefix = (
+            f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+            f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
+        )
+        _iso_second = (s, prefix)
+    return f"{prefix}.{rem // 1000:06d}Z"
 
 
 # =============== CSV HELPERS ===============
+def ensure_dir(path: Path) -> None:
+    if path in _known_dirs:
+        return
+    path.mkdir(exist_ok=True, parents=True)
+    _known_dirs.add(path)
+
+
 def get_device_csv_path(device_id: str) -> Path:
     global current_session_dir
     if current_session_dir is None:
@@ -79,27 +284,311 @@ def get_device_csv_path(device_id: str) -> Path:
     return current_session_dir / f"{device_id}.csv"
 
 
-def ensure_device_csv(device_id: str, fieldnames: list[str]) -> None:
-    csv_path = get_device_csv_path(device_id)
-    if csv_path.exists():
-        return
+# Group commit: buffered rows are flushed once FLUSH_BYTES accumulate for a
+# device, or by the background flusher every FLUSH_INTERVAL_S seconds.
+FLUSH_BYTES = 256 * 1024
+FLUSH_INTERVAL_S = 0.5
 
-    csv_path.parent.mkdir(exist_ok=True, parents=True)
-    with csv_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["server_time_utc", "device_id"] + fieldnames)
+# How long /api/stop waits for other workers to ack the stop, i.e. to write
+# out and close rows they accepted for the stopped session, and how often it
+# checks. A lone worker does not wait at all.
+STOP_ACK_TIMEOUT_S = WORKER_STALE_S
+STOP_POLL_S = 0.05
 
+# device_id -> {"path", "fd", "buf", "pending_count"}: a raw append-mode fd
+# kept open across batches plus the encoded rows not yet written to it
+_writers: dict[str, dict] = {}
 
-def append_samples(device_id: str, samples: list[dict], fieldnames: list[str]) -> None:
-    csv_path = get_device_csv_path(device_id)
-    csv_path.parent.mkdir(exist_ok=True, parents=True)
-    with csv_path.open("a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
+CSV_OPEN_FLAGS = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+
+
+def _write_all(fd: int, data: bytes | bytearray) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _csv_text(rows) -> str:
+    sio = io.StringIO()
+    csv.writer(sio).writerows(rows)
+    return sio.getvalue()
+
+
+def _get_writer(device_id: str, csv_path: Path, fieldnames: list[str]) -> dict:
+    entry = _writers.get(device_id)
+    if entry is not None:
+        if entry["path"] == csv_path:
+            return entry
+        # session changed since this handle was opened
+        _close_entry(entry)
+        del _writers[device_id]
+
+    ensure_dir(csv_path.parent)
+    try:
+        fd = os.open(csv_path, CSV_OPEN_FLAGS, 0o644)
+    except FileNotFoundError:
+        # the directory was removed behind our back; recreate it once
+        _known_dirs.discard(csv_path.parent)
+        ensure_dir(csv_path.parent)
+        fd = os.open(csv_path, CSV_OPEN_FLAGS, 0o644)
+    if os.fstat(fd).st_size == 0:
+        header = ["server_time_utc", "device_id"] + fieldnames
+        _write_all(fd, _csv_text([header]).encode("utf-8"))
+    entry = {
+        "path": csv_path,
+        "fd": fd,
+        "buf": bytearray(),
+        "pending_count": 0,
+    }
+    _writers[device_id] = entry
+    return entry
+
+
+def _flush_entry(entry: dict) -> None:
+    _write_all(entry["fd"], entry["buf"])
+    entry["buf"].clear()
+    entry["pending_count"] = 0
+
+
+def _close_entry(entry: dict) -> None:
+    _flush_entry(entry)
+    os.close(entry["fd"])
+
+
+def flush_writers() -> None:
+    # Also closes handles on a session that has ended, possibly stopped by
+    # another worker, so their rows reach disk before that worker archives.
+    sid = load_state()["session_id"]
+    live_dir = SESSIONS_DIR / sid if sid else SESSIONS_DIR
+    with state_lock:
+        for device_id, entry in list(_writers.items()):
+            if entry["path"].parent != live_dir:
+                _close_entry(entry)
+                del _writers[device_id]
+            elif entry["pending_count"]:
+                _flush_entry(entry)
+
+
+def close_writers() -> None:
+    for entry in _writers.values():
+        _close_entry(entry)
+    _writers.clear()
+
+
+def _close_writers_locked() -> None:
+    # may wait on the drainer thread for state_lock, so call it via to_thread
+    with state_lock:
+        close_writers()
+
+
+def _is_plain_csv(text: str, n_rows: int, n_cols: int) -> bool:
+    # True when joining with "," produced exactly what csv.writer would:
+    # no field needed quoting and no None was stringified.
+    return (
+        text.count(",") == n_rows * (n_cols - 1)
+        and text.count("\n") == n_rows
+        and text.count("\r") == n_rows
+        and '"' not in text
+        and "None" not in text
+    )
+
+
+# Schemas are client-controlled, so the per-schema caches below are bounded.
+SCHEMA_CACHE_SIZE = 64
+
+
+# tuple(fieldnames) -> itemgetter returning one sample's values as a tuple
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _make_getter(key: tuple[str, ...]) -> Callable[[dict], tuple]:
+    # itemgetter needs at least one key, and a single-key one returns a bare
+    # value rather than a tuple
+    if not key:
+        return lambda s: ()
+    if len(key) == 1:
+        field = key[0]
+        return lambda s: (s[field],)
+    return itemgetter(*key)
+
+
+def _project(samples: list[dict], fieldnames: list[str]) -> list[tuple]:
+    key = tuple(fieldnames)
+    getter = _make_getter(key)
+    try:
+        return list(map(getter, samples))
+    except KeyError:
         for s in samples:
-            row = [utc_now_iso(), device_id]
-            for key in fieldnames:
-                row.append(s.get(key, ""))
-            writer.writerow(row)
+            for k in key:
+                s.setdefault(k, "")
+        return list(map(getter, samples))
+
+
+# tuple(fieldnames) -> generated formatter(ts, device_id, samples) -> str that
+# renders a whole batch with the schema's field lookups inlined
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _compile_formatter(key: tuple[str, ...]) -> Callable[[str, str, list[dict]], str]:
+    # Field names come from the client, so they are passed in as _k0.._kN
+    # globals and never spliced into the generated source.
+    namespace = {f"_k{i}": k for i, k in enumerate(key)}
+    fields = "".join(f",{{s[_k{i}]}}" for i in range(len(key)))
+    src = (
+        "def _fmt(ts, dev, samples):\n"
+        f"    return ''.join([f'{{ts}},{{dev}}{fields}\\r\\n' for s in samples])\n"
+    )
+    exec(src, namespace)
+    return namespace["_fmt"]
+
+
+def _format_plain(ts: str, device_id: str, samples: list[dict], fieldnames: list[str]) -> str:
+    key = tuple(fieldnames)
+    fmt = _compile_formatter(key)
+    try:
+        return fmt(ts, device_id, samples)
+    except KeyError:
+        for s in samples:
+            for k in key:
+                s.setdefault(k, "")
+        return fmt(ts, device_id, samples)
+
+
+def append_samples(device_id: str, samples: list[dict], fieldnames: list[str], csv_path: Path) -> None:
+    with state_lock:
+        entry = _get_writer(device_id, csv_path, fieldnames)
+        # one server timestamp per batch, not per row
+        ts = utc_now_iso()
+        text = _format_plain(ts, device_id, samples, fieldnames)
+        if not _is_plain_csv(text, len(samples), len(fieldnames) + 2):
+            rows = [(ts, device_id, *vals) for vals in _project(samples, fieldnames)]
+            text = _csv_text(rows)
+        entry["buf"] += text.encode("utf-8")
+        entry["pending_count"] += 1
+        if len(entry["buf"]) >= FLUSH_BYTES:
+            _flush_entry(entry)
+
+
+def write_batches(batches: list[tuple]) -> None:
+    # coalesce queued (csv_path, device_id, samples, fieldnames) batches so each
+    # device file gets one append_samples call per drain
+    groups: dict[tuple, list[dict]] = {}
+    for csv_path, device_id, samples, fieldnames in batches:
+        groups.setdefault((csv_path, device_id, tuple(fieldnames)), []).extend(samples)
+    for (csv_path, device_id, fields), samples in groups.items():
+        # one failing group must not cost the other devices their rows
+        try:
+            append_samples(device_id, samples, list(fields), csv_path)
+        except Exception:
+            logger.exception("Failed to write %d samples from %s to %s", len(samples), device_id, csv_path)
+
+
+# =============== ZIP HELPERS ===============
+ZIP_CHUNK_SIZE = 1 << 16
+
+
+# Write-only sink: collects whatever ZipFile writes until drained.
+class _ChunkStream(io.RawIOBase):
+    def __init__(self):
+        self.buf = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.buf += b
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = bytes(self.buf)
+        self.buf.clear()
+        return data
+
+
+# ?compression= value -> (zipfile method, compresslevel); "zstd" falls back to
+# a .tar.zst stream (via the zstandard package) before Python 3.14.
+ZIP_METHODS = {
+    "stored": (zipfile.ZIP_STORED, None),
+    "deflate": (zipfile.ZIP_DEFLATED, 1),
+}
+if hasattr(zipfile, "ZIP_ZSTANDARD"):
+    ZIP_METHODS["zstd"] = (zipfile.ZIP_ZSTANDARD, 3)
+
+ZSTD_LEVEL = 3
+EMPTY_NOTE = b"No data collected."
+
+
+def _session_files(session_dir: Path) -> list[Path]:
+    if not session_dir.exists():
+        return []
+    return list(session_dir.glob("*.csv"))
+
+
+def iter_session_zip(session_dir: Path, method: int = zipfile.ZIP_DEFLATED, level: int | None = 1):
+    # Sync generator: StreamingResponse runs it in the threadpool, so the
+    # compression work stays off the event loop.
+    stream = _ChunkStream()
+    with zipfile.ZipFile(stream, "w", compression=method, compresslevel=level) as zf:
+        files = _session_files(session_dir)
+        if not files:
+            zf.writestr("empty.txt", EMPTY_NOTE)
+        else:
+            for csv_file in files:
+                # from_file records the real size (so ZIP64 kicks in when needed)
+                # and mtime, as ZipFile.write would
+                zinfo = zipfile.ZipInfo.from_file(csv_file, csv_file.name)
+                zinfo.compress_type = method
+                # ZipFile.write sets the level the same way; 3.13 made the
+                # attribute public as compress_level
+                if hasattr(zinfo, "compress_level"):
+                    zinfo.compress_level = level
+                else:
+                    zinfo._compresslevel = level
+                with csv_file.open("rb") as src, zf.open(zinfo, "w") as dst:
+                    while chunk := src.read(ZIP_CHUNK_SIZE):
+                        dst.write(chunk)
+                        if stream.buf:
+                            yield stream.drain()
+                yield stream.drain()
+    yield stream.drain()
+
+
+def _tar_header(name: str, size: int, mtime: float) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT)
+
+
+def iter_session_tar_zst(session_dir: Path):
+    # Members are written by hand rather than with TarFile.add, which copies
+    # a whole file before control returns here, so chunks can be drained as
+    # they are compressed, as iter_session_zip does.
+    stream = _ChunkStream()
+    offset = 0
+    with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(stream, closefd=False) as zw:
+        files = _session_files(session_dir)
+        if not files:
+            header = _tar_header("empty.txt", len(EMPTY_NOTE), time.time())
+            offset += zw.write(header) + zw.write(EMPTY_NOTE)
+            offset += zw.write(tarfile.NUL * (-offset % tarfile.BLOCKSIZE))
+        for csv_file in files:
+            st = csv_file.stat()
+            offset += zw.write(_tar_header(csv_file.name, st.st_size, st.st_mtime))
+            remaining = st.st_size
+            with csv_file.open("rb") as src:
+                # copy exactly the size in the header, as TarFile.addfile does
+                while remaining and (chunk := src.read(min(ZIP_CHUNK_SIZE, remaining))):
+                    offset += zw.write(chunk)
+                    remaining -= len(chunk)
+                    if stream.buf:
+                        yield stream.drain()
+            if remaining:
+                raise OSError(f"{csv_file} shrank while archiving")
+            # pad the member data to a whole block
+            offset += zw.write(tarfile.NUL * (-offset % tarfile.BLOCKSIZE))
+            yield stream.drain()
+        # end with two zero blocks and fill the last record, as TarFile.close does
+        offset += zw.write(tarfile.NUL * (2 * tarfile.BLOCKSIZE))
+        zw.write(tarfile.NUL * (-offset % tarfile.RECORDSIZE))
+    yield stream.drain()
 
 
 # =============== ROUTES ===============
@@ -108,9 +597,8 @@ async def root():
     return HTMLResponse("<h2>IoT Logger</h2><p>Go to <a href='/dashboard'>Dashboard</a></p>")
 
 
-@app.get("/dashboard")
-async def dashboard():
-    html = """
+# The dashboard is static: encode it once and let browsers cache it.
+DASHBOARD_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -133,40 +621,180 @@ async def dashboard():
         <pre id="info"></pre>
 
         <script>
-            async function updateStatus() {
-                try {
-                    let res = await fetch('/api/config?device_id=browser');
-                    let data = await res.json();
-                    let box = document.getElementById('statusBox');
-                    if (data.logging) {
-                        box.className = "status running";
-                        box.innerText = "Status: LOGGING (start_epoch: " + data.start_epoch + ")";
-                    } else {
-                        box.className = "status stopped";
-                        box.innerText = "Status: STOPPED";
-                    }
-                } catch(e) { console.error(e); }
+            function renderStatus(data) {
+                let box = document.getElementById('statusBox');
+                if (data.logging) {
+                    box.className = "status running";
+                    box.innerText = "Status: LOGGING (start_epoch: " + data.start_epoch + ")";
+                } else {
+                    box.className = "status stopped";
+                    box.innerText = "Status: STOPPED";
+                }
             }
 
             async function startSession() {
                 let res = await fetch('/api/start', {method: 'POST'});
                 let data = await res.json();
                 document.getElementById('info').innerText = JSON.stringify(data, null, 2);
-                updateStatus();
             }
 
             async function stopSession() {
                 window.location.href = '/api/stop';
-                setTimeout(updateStatus, 1000);
             }
 
-            setInterval(updateStatus, 2000);
-            updateStatus();
+            // server pushes the status whenever it changes
+            const events = new EventSource('/api/events');
+            events.onmessage = (e) => renderStatus(JSON.parse(e.data));
+            events.onerror = (e) => console.error(e);
         </script>
     </body>
     </html>
     """
-    return HTMLResponse(html)
+DASHBOARD_HTML_BYTES = DASHBOARD_HTML.encode("utf-8")
+
+
+@app.get("/dashboard")
+async def dashboard():
+    return Response(
+        content=DASHBOARD_HTML_BYTES,
+        media_type="text/html; charset=utf-8",
+        headers={"Cache-Control": "max-age=3600"},
+    )
+
+
+async def _flusher() -> None:
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_S)
+        seq = state_seq()
+        ack_state()
+        if seq != _acked_seq:
+            # batches queued before the change still target the old paths
+            await _write_q.join()
+        await asyncio.to_thread(flush_writers)
+        ack_state(seq)
+
+
+async def wait_for_workers(seq: int) -> None:
+    deadline = time.monotonic() + STOP_ACK_TIMEOUT_S
+    while behind := workers_behind(seq):
+        if time.monotonic() >= deadline:
+            logger.warning("%d workers did not ack the stop within %.1fs", behind, STOP_ACK_TIMEOUT_S)
+            return
+        await asyncio.sleep(STOP_POLL_S)
+
+
+WRITE_QUEUE_SIZE = 10000
+
+# Bulk uploads are queued here and written by a single drainer task, which
+# takes everything queued at once and writes it in one pass.
+_write_q: asyncio.Queue | None = None
+
+
+async def _drain_writes() -> None:
+    while True:
+        batches = [await _write_q.get()]
+        while True:
+            try:
+                batches.append(_write_q.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        try:
+            await asyncio.to_thread(write_batches, batches)
+        except Exception:
+            logger.exception("Failed to write %d queued batches", len(batches))
+        finally:
+            for _ in batches:
+                _write_q.task_done()
+
+
+_background_tasks: list[asyncio.Task] = []
+
+# Loop-bound objects are created per lifespan in on_startup, so a second
+# app lifespan in the same process (e.g. another TestClient) starts clean.
+# _state_changed is replaced on every notify so each waiter wakes exactly
+# once per change; _shutdown ends open event streams.
+_state_changed: asyncio.Event | None = None
+_shutdown: asyncio.Event | None = None
+
+
+@app.on_event("startup")
+async def on_startup():
+    global _write_q, _state_changed, _shutdown
+    _state_changed = asyncio.Event()
+    _shutdown = asyncio.Event()
+    _write_q = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+    claim_worker_slot()
+    _background_tasks.append(asyncio.create_task(_flusher()))
+    _background_tasks.append(asyncio.create_task(_drain_writes()))
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    request_shutdown()
+    if _write_q is not None:
+        await _write_q.join()
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    await asyncio.to_thread(_close_writers_locked)
+    release_worker_slot()
+
+
+# ---------------- STATUS PUSH (SSE) ----------------
+SSE_CHECK_INTERVAL_S = 1.0
+SSE_KEEPALIVE_S = 15.0
+# Servers such as uvicorn wait for open requests before running the lifespan
+# shutdown, so streams also end on their own after SSE_STREAM_MAX_S; the
+# browser's EventSource reconnects after SSE_RETRY_MS.
+SSE_STREAM_MAX_S = 30.0
+SSE_RETRY_MS = 1000
+
+def notify_state_changed() -> None:
+    global _state_changed
+    if _state_changed is None:
+        return
+    event, _state_changed = _state_changed, asyncio.Event()
+    event.set()
+
+
+def request_shutdown() -> None:
+    if _shutdown is not None:
+        _shutdown.set()
+    notify_state_changed()
+
+
+async def _event_gen():
+    last = None
+    idle = 0.0
+    shutdown = _shutdown
+    deadline = time.monotonic() + SSE_STREAM_MAX_S
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+    while not shutdown.is_set() and time.monotonic() < deadline:
+        changed = _state_changed
+        # start/stop handled by another worker never sets our event, so the
+        # shared state is also re-checked every SSE_CHECK_INTERVAL_S
+        state = load_state()
+        current = {"logging": state["logging"], "start_epoch": state["start_epoch"]}
+        if current != last:
+            last = current
+            idle = 0.0
+            yield f"data: {json_dumps(current).decode()}\n\n"
+        elif idle >= SSE_KEEPALIVE_S:
+            idle = 0.0
+            yield ": keepalive\n\n"
+        try:
+            await asyncio.wait_for(changed.wait(), SSE_CHECK_INTERVAL_S)
+        except asyncio.TimeoutError:
+            idle += SSE_CHECK_INTERVAL_S
+
+
+@app.get("/api/events")
+async def api_events():
+    return StreamingResponse(
+        _event_gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 
 # ---------------- START SESSION ----------------
@@ -188,7 +816,7 @@ async def api_start():
         start_epoch = int(now.timestamp())
         session_id = new_session_id()
         session_dir = SESSIONS_DIR / session_id
-        session_dir.mkdir(exist_ok=True, parents=True)
+        ensure_dir(session_dir)
 
         state["logging"] = True
         state["start_epoch"] = start_epoch
@@ -197,8 +825,9 @@ async def api_start():
 
         sync_from_state(state)
         current_session_dir = session_dir
+        notify_state_changed()
 
-        print(f"✅ Session STARTED: {session_id}")
+        logger.info("Session started: %s", session_id)
 
         return {
             "status": "started",
@@ -210,7 +839,13 @@ async def api_start():
 
 # ---------------- STOP SESSION ----------------
 @app.get("/api/stop")
-async def api_stop():
+async def api_stop(compression: str = "deflate"):
+    use_tar_zst = compression == "zstd" and "zstd" not in ZIP_METHODS
+    if use_tar_zst and zstandard is None:
+        raise HTTPException(status_code=400, detail="zstd compression is not available")
+    if compression not in ZIP_METHODS and not use_tar_zst:
+        raise HTTPException(status_code=400, detail=f"Unknown compression: {compression}")
+
     with state_lock:
         state = load_state()
         session_id = state.get("session_id")
@@ -222,31 +857,35 @@ async def api_stop():
         state["logging"] = False
         state["start_epoch"] = 0
         state["session_id"] = None
-        save_state(state)
+        stop_seq = save_state(state)
 
         sync_from_state(state)
-
-        print(f"🛑 Session STOPPED: {session_id}")
-
-    mem = io.BytesIO()
-    with zipfile.ZipFile(mem, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        if session_dir.exists():
-            files = list(session_dir.glob("*.csv"))
-        else:
-            files = []
-
-        if not files:
-            zf.writestr("empty.txt", "No data collected.")
-        else:
-            for csv_file in files:
-                zf.write(csv_file, arcname=csv_file.name)
-    mem.seek(0)
+        notify_state_changed()
+
+        logger.info("Session stopped: %s", session_id)
+
+    # let batches queued before the stop reach the files, then flush and
+    # close them so the archive sees every row, then wait for the other
+    # workers to do the same
+    await _write_q.join()
+    await asyncio.to_thread(_close_writers_locked)
+    ack_state(stop_seq)
+    await wait_for_workers(stop_seq)
+
+    if use_tar_zst:
+        body = iter_session_tar_zst(session_dir)
+        media_type = "application/zstd"
+        filename = f"session_{session_id}.tar.zst"
+    else:
+        body = iter_session_zip(session_dir, *ZIP_METHODS[compression])
+        media_type = "application/zip"
+        filename = f"session_{session_id}.zip"
 
     return StreamingResponse(
-        mem,
-        media_type="application/zip",
+        body,
+        media_type=media_type,
         headers={
-            "Content-Disposition": f'attachment; filename="session_{session_id}.zip"'
+            "Content-Disposition": f'attachment; filename="{filename}"'
         }
     )
 
@@ -262,29 +901,66 @@ async def api_config(device_id: str):
 
 
 # ---------------- BULK UPLOAD FROM ARDUINO ----------------
+MAX_BULK = 2_000_000
+
+
+async def read_bulk_body(request: Request) -> bytes:
+    # enforce MAX_BULK while reading instead of buffering an oversized body
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_BULK:
+        raise HTTPException(status_code=413, detail="Payload too large")
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_BULK:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def looks_like_bulk_payload(body: bytes) -> bool:
+    # cheap shape check on the raw bytes before paying for a full parse
+    if not (body.startswith(b"{") or body.lstrip().startswith(b"{")):
+        return False
+    return b'"device_id"' in body and b'"samples"' in body
+
+
 @app.post("/api/bulk_samples")
 async def api_bulk_samples(request: Request):
     global current_session_dir
 
-    body = await request.body()
-    print("📥 /api/bulk_samples called")
-    print(f"  body_len={len(body)}")
+    try:
+        body = await read_bulk_body(request)
+    except ClientDisconnect:
+        logger.debug("Client disconnected during upload")
+        return {"status": "error", "reason": "client_disconnected"}
+    logger.debug("/api/bulk_samples called, body_len=%d", len(body))
+
+    if not looks_like_bulk_payload(body):
+        logger.debug("Invalid payload: missing device_id or samples")
+        return {"status": "error", "reason": "invalid_format"}
 
     try:
-        data = json.loads(body)
+        data = json_loads(body)
     except json.JSONDecodeError as e:
-        print(f"❌ JSON decode error: {e}")
+        logger.debug("JSON decode error: %s", e)
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
     device_id = data.get("device_id")
     samples = data.get("samples")
 
-    if not device_id or not isinstance(samples, list):
-        print("❌ Invalid payload: missing device_id or samples")
+    if (
+        not device_id
+        or not isinstance(device_id, str)
+        or not isinstance(samples, list)
+        or not all(isinstance(s, dict) for s in samples)
+    ):
+        logger.debug("Invalid payload: missing device_id or samples")
         return {"status": "error", "reason": "invalid_format"}
 
     if len(samples) == 0:
-        print(f"ℹ️ No samples in request for device {device_id}")
+        logger.debug("No samples in request for device %s", device_id)
         return {"status": "ok", "written": 0}
 
     state = load_state()
@@ -296,12 +972,15 @@ async def api_bulk_samples(request: Request):
     first = samples[0]
     fieldnames = sorted(first.keys())
 
-    print(f"  device_id={device_id}, sample_count={len(samples)}, fieldnames={fieldnames}")
-    print(f"  session_dir={current_session_dir}")
+    logger.debug(
+        "device_id=%s, sample_count=%d, fieldnames=%s, session_dir=%s",
+        device_id, len(samples), fieldnames, current_session_dir,
+    )
 
-    ensure_device_csv(device_id, fieldnames)
-    append_samples(device_id, samples, fieldnames)
+    csv_path = get_device_csv_path(device_id)
+    # the drainer task does the file I/O off the event loop
+    await _write_q.put((csv_path, device_id, samples, fieldnames))
 
-    print(f"📝 Saved {len(samples)} samples from {device_id} into {get_device_csv_path(device_id)}")
+    logger.debug("Queued %d samples from %s for %s", len(samples), device_id, csv_path)
 
-    return {"status": "ok", "written": len(samples)}
+    return {"status": "queued", "queued": len(samples)}